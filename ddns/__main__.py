@@ -1,13 +1,33 @@
 from __future__ import annotations
 import argparse
 import sys
+import threading
 import time
-from typing import List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, List, Tuple, Dict
+from . import cloudflare
+from ._util import split_csv
 from .config import load_settings, load_all_settings, Settings
-from .updater import run_once, run_loop
+from .updater import rate_limit_delay, run_once, run_loop, run_zone
+
+# Upper bound on zones updated concurrently in one run; matches the API connection
+# pool so each worker reuses its own kept-alive connection
+MAX_WORKERS = cloudflare.MAX_CONNECTIONS
+
+
+_PARSER: argparse.ArgumentParser | None = None
 
 
 def build_parser() -> argparse.ArgumentParser:
+    # Built once per process; parse_args does not mutate the parser, so reuse is safe
+    global _PARSER
+    if _PARSER is None:
+        _PARSER = _make_parser()
+    return _PARSER
+
+
+def _make_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(description="Cloudflare DDNS Updater")
     p.add_argument("--env", dest="env_path", help="Path to .env file", default=None)
     # Single zone overrides (backwards compatible)
@@ -28,38 +48,44 @@ def build_parser() -> argparse.ArgumentParser:
     return p
 
 
+def _global_overrides(args: argparse.Namespace) -> Dict[str, Any]:
+    # Only the fields actually given on the command line
+    changes: Dict[str, Any] = {}
+    if args.record_type:
+        changes["record_type"] = args.record_type
+    if args.ttl is not None:
+        changes["ttl"] = args.ttl
+    if args.proxied is not None:
+        changes["proxied"] = args.proxied
+    if args.interval is not None:
+        changes["interval"] = args.interval
+    if args.dry_run:
+        changes["dry_run"] = True
+    return changes
+
+
 def _apply_single_overrides(settings: Settings, args: argparse.Namespace) -> Settings:
-    return Settings(
-        api_token=settings.api_token,
-        api_key=settings.api_key,
-        email=settings.email,
+    return replace(
+        settings,
         zone_name=args.zone_name or settings.zone_name,
         record_name=(args.record_name or settings.record_name or args.zone_name or settings.zone_name),
-        record_type=(args.record_type or settings.record_type).upper(),
-        ttl=args.ttl if args.ttl is not None else settings.ttl,
-        proxied=settings.proxied if args.proxied is None else args.proxied,
-        interval=(settings.interval if args.interval is None else args.interval),
-        dry_run=settings.dry_run or args.dry_run,
+        **_global_overrides(args),
     )
 
 
-def _parse_csv(csv: str | None) -> List[str]:
-    if not csv:
-        return []
-    return [part.strip() for part in csv.split(',') if part.strip()]
-
-
 def _apply_multi_overrides(settings_list: List[Settings], args: argparse.Namespace) -> List[Settings]:
     # Determine base auth + common attributes from first settings (env already validated)
     if not settings_list:
         return settings_list
     base = settings_list[0]
 
-    zones = _parse_csv(args.zones_csv) if args.zones_csv else None
-    records_csv = _parse_csv(args.records_csv) if args.records_csv else []
+    zones = split_csv(args.zones_csv)
+    records_csv = split_csv(args.records_csv)
+    # Global overrides (record_type, ttl, proxied, interval, dry_run)
+    changes = _global_overrides(args)
 
     # If no zones override provided, keep existing list (maybe env multi or single); still apply global overrides
-    if zones is not None and len(zones) > 0:
+    if zones:
         # Build new settings list from zones override
         if records_csv:
             if len(records_csv) != len(zones):
@@ -70,63 +96,66 @@ def _apply_multi_overrides(settings_list: List[Settings], args: argparse.Namespa
         else:
             # default each zone's record name to itself
             record_names = zones[:]
-        settings_list = [
-            Settings(
-                api_token=base.api_token,
-                api_key=base.api_key,
-                email=base.email,
-                zone_name=z,
-                record_name=r,
-                record_type=base.record_type,
-                ttl=base.ttl,
-                proxied=base.proxied,
-                interval=base.interval,
-                dry_run=base.dry_run,
-            )
-            for z, r in zip(zones, record_names)
-        ]
-
-    # Apply global overrides (record_type, ttl, proxied, interval, dry_run)
-    updated: List[Settings] = []
+        return [replace(base, zone_name=z, record_name=r, **changes) for z, r in zip(zones, record_names)]
+
+    if not changes:
+        return settings_list
+    return [replace(s, **changes) for s in settings_list]
+
+
+def _group_by_zone(settings_list: List[Settings]) -> Dict[str, List[Settings]]:
+    # Records sharing a zone are handled together: one lookup, one listing, one batch
+    zones: Dict[str, List[Settings]] = {}
     for s in settings_list:
-        updated.append(
-            Settings(
-                api_token=s.api_token,
-                api_key=s.api_key,
-                email=s.email,
-                zone_name=s.zone_name,
-                record_name=s.record_name,
-                record_type=(args.record_type or s.record_type).upper(),
-                ttl=args.ttl if args.ttl is not None else s.ttl,
-                proxied=s.proxied if args.proxied is None else args.proxied,
-                interval=(s.interval if args.interval is None else args.interval),
-                dry_run=s.dry_run or args.dry_run,
-            )
-        )
-
-    return updated
+        zones.setdefault(s.zone_name, []).append(s)
+    return zones
+
+
+def _update_zones(
+    zones: Dict[str, List[Settings]],
+    ip_getter: Callable[[str], str],
+    verbose: bool,
+    last_ips: Dict[Tuple[str, str], str] | None = None,
+) -> List[Exception]:
+    # Zones are independent and network-bound, so update them concurrently
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(zones)) or 1) as ex:
+        futures = [ex.submit(run_zone, group, ip_getter=ip_getter, last_ips=last_ips) for group in zones.values()]
+
+    errors: List[Exception] = []
+    # Report in configuration order rather than completion order
+    for (zone_name, group), future in zip(zones.items(), futures):
+        try:
+            results = future.result()
+        except Exception as e:  # continue other zones
+            errors.append(e)
+            print(f"Error updating {zone_name}: {e}", file=sys.stderr)
+            continue
+        for s, result in zip(group, results):
+            if result["action"] == "error":  # this record only; the zone's other results stand
+                errors.append(result["error"])
+                print(f"Error updating {s.zone_name}/{s.record_name}: {result['error']}", file=sys.stderr)
+                continue
+            if last_ips is not None:
+                key = (s.zone_name, s.record_name)
+                last_ips[key] = result.get("ip", last_ips.get(key))
+            if verbose:
+                print(f"{s.zone_name} {s.record_name} {s.record_type} -> {result['action']} ip={result.get('ip')} id={result.get('record_id')}")
+    return errors
 
 
 def _run_multi_once(settings_list: List[Settings], verbose: bool) -> int:
     # Cache IP per record type to reduce outbound queries
     from .ip import get_public_ip as _get_public_ip
     ip_cache: Dict[str, str] = {}
+    ip_lock = threading.Lock()
 
     def ip_getter(rt: str) -> str:
-        if rt not in ip_cache:
-            ip_cache[rt] = _get_public_ip(rt)
-        return ip_cache[rt]
+        with ip_lock:  # zones run in parallel; only the first caller per type queries
+            if rt not in ip_cache:
+                ip_cache[rt] = _get_public_ip(rt)
+            return ip_cache[rt]
 
-    exit_code = 0
-    for s in settings_list:
-        try:
-            result = run_once(s, ip_getter=ip_getter)
-            if verbose:
-                print(f"{s.zone_name} {s.record_name} {s.record_type} -> {result['action']} ip={result.get('ip')} id={result.get('record_id')}")
-        except Exception as e:  # continue others
-            exit_code = 1
-            print(f"Error updating {s.zone_name}/{s.record_name}: {e}", file=sys.stderr)
-    return exit_code
+    return 1 if _update_zones(_group_by_zone(settings_list), ip_getter, verbose) else 0
 
 
 def _run_multi_loop(settings_list: List[Settings], interval: int, verbose: bool, force_once: bool, ip_getter=None) -> int:
@@ -140,16 +169,16 @@ def _run_multi_loop(settings_list: List[Settings], interval: int, verbose: bool,
     last_ips: Dict[Tuple[str, str], str] = {}
     from .ip import get_public_ip as _get_public_ip
     iteration = 0
+    # One outbound IP lookup per record type per window, however many zones share it
+    ip_max_age = min(interval, 60)
+    zones = _group_by_zone(settings_list)
+    delay = interval
+
+    def cached_get(rt: str) -> str:
+        return _get_public_ip(rt, max_age=ip_max_age)
 
     while True:  # pragma: no cover
         iteration += 1
-        # Clear IP cache for each iteration to fetch fresh IP
-        ip_cache: Dict[str, str] = {}
-
-        def cached_get(rt: str) -> str:
-            if rt not in ip_cache:
-                ip_cache[rt] = _get_public_ip(rt)
-            return ip_cache[rt]
 
         # Log iteration start with IP comparison
         if verbose:
@@ -165,16 +194,18 @@ def _run_multi_loop(settings_list: List[Settings], interval: int, verbose: bool,
             else:
                 print(f"--- Iteration {iteration}: current_ip={current_ip} [initial check] ---")
 
-        for s in settings_list:
-            key = (s.zone_name, s.record_name)
-            try:
-                result = run_once(s, last_ip=last_ips.get(key), ip_getter=cached_get)
-                last_ips[key] = result.get("ip", last_ips.get(key))
-                if verbose:
-                    print(f"{s.zone_name} {s.record_name} {s.record_type} -> {result['action']} ip={result.get('ip')} id={result.get('record_id')}")
-            except Exception as e:
-                print(f"Error updating {s.zone_name}/{s.record_name}: {e}", file=sys.stderr)
-        time.sleep(interval)
+        # Per zone: plan every record against one listing, then apply the writes together.
+        # Zones whose records all match last_ips make no Cloudflare calls at all.
+        errors = _update_zones(zones, cached_get, verbose, last_ips=last_ips)
+        # Back off instead of hammering the API while Cloudflare is throttling us
+        rate_limited = [e for e in errors if isinstance(e, cloudflare.CloudflareRateLimitError)]
+        if rate_limited:
+            delay = rate_limit_delay(interval, delay, rate_limited[0])
+            if verbose:
+                print(f"Rate limited by Cloudflare; next iteration in {delay}s")
+        else:
+            delay = interval
+        time.sleep(delay)
 
 
 def main(argv: list[str] | None = None) -> int:
@@ -196,11 +227,6 @@ def main(argv: list[str] | None = None) -> int:
             print(f"Argument error: {e}", file=sys.stderr)
             return 2
 
-        # Basic validation
-        for s in settings_list:
-            if s.record_type not in {"A", "AAAA"}:
-                print("Record type must be A or AAAA", file=sys.stderr)
-                return 2
         if args.verbose:
             zones_desc = ", ".join(f"{s.zone_name}:{s.record_name}" for s in settings_list)
             print(f"Starting DDNS updater (multi): zones={zones_desc} type={settings_list[0].record_type} dry_run={settings_list[0].dry_run} interval={settings_list[0].interval}")
@@ -217,11 +243,10 @@ def main(argv: list[str] | None = None) -> int:
             return 130
     else:
         # Single mode legacy path
-        settings = settings_list[0]
-        settings = _apply_single_overrides(settings, args)
-
-        if settings.record_type not in {"A", "AAAA"}:
-            print("Record type must be A or AAAA", file=sys.stderr)
+        try:
+            settings = _apply_single_overrides(settings_list[0], args)
+        except ValueError as e:
+            print(f"Argument error: {e}", file=sys.stderr)
             return 2
 
         if args.verbose:
@@ -0,0 +1,18 @@
+from __future__ import annotations
+import re
+from typing import List
+
+_SPLIT_RE = re.compile(r"\s*,\s*")
+
+
+def split_csv(value: str | None) -> List[str]:
+    """Split a comma-separated value, trimming whitespace and dropping empty items."""
+    if not value:
+        return []
+    # Every whitespace character except " " is non-printable, so this C-level test
+    # is exact: the common env var form (a.com,b.com) has nothing to trim
+    if " " not in value and value.isprintable():
+        parts = value.split(",")
+    else:
+        parts = _SPLIT_RE.split(value.strip())
+    return list(filter(None, parts))
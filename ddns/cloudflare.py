@@ -1,16 +1,104 @@
 from __future__ import annotations
-import requests
-from typing import Any, Optional
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from .version import __version__
+
+if TYPE_CHECKING:
+    import requests
 
 API_BASE = "https://api.cloudflare.com/client/v4"
+# Kept-alive connections to the API host; concurrent callers beyond this wait for a free one
+MAX_CONNECTIONS = 8
+# Statuses meaning Cloudflare did not process the request, so even a POST is safe to resend
+_UNPROCESSED_STATUSES = frozenset({429, 503})
+
+
+def _build_session() -> requests.Session:
+    # Imported here: requests/urllib3/ssl dominate start-up time of a one-shot run
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    class _Retry(Retry):
+        # POST (create, batch) is not idempotent: after a 502/504 the write may already
+        # have been applied, so it is only resent when the status says it was not
+        def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+            if method.upper() == "POST":
+                return status_code in _UNPROCESSED_STATUSES
+            return super().is_retry(method, status_code, has_retry_after)
+
+    # One pooled session so every API call reuses the keep-alive TLS connection
+    session = requests.Session()
+    # Throttling and gateway errors are retried here, honouring Retry-After. Once retries
+    # run out the last response is returned (raise_on_status=False) so _handle can type it.
+    retry = _Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "PUT"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    # All calls go to one host, so a single pool; blocking keeps the connection count
+    # bounded and every request on an already-open TLS connection
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONNECTIONS, pool_block=True, max_retries=retry))
+    session.headers["User-Agent"] = f"cloudflare-ddns/{__version__}"
+    return session
+
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+_LOADS: Callable[[bytes], Any] | None = None
+
+
+def _loads(content: bytes) -> Any:
+    # Resolved on first response, like the session, so runs that never call the API skip the import
+    global _LOADS
+    if _LOADS is None:
+        try:  # optional, faster decoder for API responses
+            from orjson import loads
+        except ImportError:  # pragma: no cover - depends on installed extras
+            from json import loads
+        _LOADS = loads
+    return _LOADS(content)
 
 class CloudflareAPIError(RuntimeError):
     pass
 
 
+class CloudflareRateLimitError(CloudflareAPIError):
+    """Cloudflare still answered 429 after the session's retries."""
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after(resp: requests.Response) -> float | None:
+    try:
+        return float(resp.headers.get("Retry-After", ""))
+    except ValueError:  # missing, or an HTTP-date
+        return None
+
+
 def _handle(resp: requests.Response) -> dict[str, Any]:
+    if resp.status_code == 429:
+        retry_after = _retry_after(resp)
+        raise CloudflareRateLimitError(f"Rate limited by Cloudflare (retry after {retry_after}s)", retry_after=retry_after)
     try:
-        data = resp.json()
+        data = _loads(resp.content)
     except Exception:
         resp.raise_for_status()
         raise
@@ -19,48 +107,113 @@ def _handle(resp: requests.Response) -> dict[str, Any]:
     return data
 
 
+# Zone IDs are immutable, so they are remembered for the life of the process.
+# Keyed by credential as well as name since different accounts may see different zones.
+_ZONE_ID_CACHE: dict[tuple[str | None, str], str] = {}
+
+
+def _zone_cache_key(headers: dict[str, str], zone_name: str) -> tuple[str | None, str]:
+    return (headers.get("Authorization") or headers.get("X-Auth-Key"), zone_name)
+
+
 def get_zone_id(headers: dict[str, str], zone_name: str) -> str:
+    key = _zone_cache_key(headers, zone_name)
+    cached = _ZONE_ID_CACHE.get(key)
+    if cached:
+        return cached
     params = {"name": zone_name, "status": "active"}
-    resp = requests.get(f"{API_BASE}/zones", headers=headers, params=params, timeout=15)
+    resp = _session().get(f"{API_BASE}/zones", headers=headers, params=params, timeout=15)
     data = _handle(resp)
     result = data.get("result", [])
     if not result:
         raise CloudflareAPIError(f"Zone not found: {zone_name}")
+    _ZONE_ID_CACHE[key] = result[0]["id"]
     return result[0]["id"]
 
 
+def forget_zone_id(headers: dict[str, str], zone_name: str) -> None:
+    """Drop a memoized zone ID, e.g. after an API error that may mean it went stale."""
+    _ZONE_ID_CACHE.pop(_zone_cache_key(headers, zone_name), None)
+
+
+# (zone_id, type, name) -> (ETag, record) of the last lookup, replayed on 304 Not Modified
+_RECORD_ETAG_CACHE: dict[tuple[str, str, str], tuple[str, Optional[dict[str, Any]]]] = {}
+
+
 def find_dns_record(headers: dict[str, str], zone_id: str, record_type: str, name: str) -> Optional[dict[str, Any]]:
-    params = {"type": record_type.upper(), "name": name}
-    resp = requests.get(f"{API_BASE}/zones/{zone_id}/dns_records", headers=headers, params=params, timeout=15)
+    params = {"type": record_type, "name": name}
+    key = (zone_id, record_type, name)
+    cached = _RECORD_ETAG_CACHE.get(key)
+    request_headers = {**headers, "If-None-Match": cached[0]} if cached else headers
+    resp = _session().get(f"{API_BASE}/zones/{zone_id}/dns_records", headers=request_headers, params=params, timeout=15)
+    if resp.status_code == 304 and cached:
+        return cached[1]
     data = _handle(resp)
     result = data.get("result", [])
-    if result:
-        return result[0]
-    return None
+    record = result[0] if result else None
+    etag = resp.headers.get("ETag")
+    if etag:
+        _RECORD_ETAG_CACHE[key] = (etag, record)
+    return record
 
 
 def create_dns_record(headers: dict[str, str], zone_id: str, record_type: str, name: str, content: str, ttl: int, proxied: bool) -> dict[str, Any]:
     payload = {
-        "type": record_type.upper(),
+        "type": record_type,
         "name": name,
         "content": content,
         "ttl": ttl,
         "proxied": proxied,
     }
-    resp = requests.post(f"{API_BASE}/zones/{zone_id}/dns_records", headers=headers, json=payload, timeout=15)
+    resp = _session().post(f"{API_BASE}/zones/{zone_id}/dns_records", headers=headers, json=payload, timeout=15)
     data = _handle(resp)
     return data["result"]
 
 
 def update_dns_record(headers: dict[str, str], zone_id: str, record_id: str, record_type: str, name: str, content: str, ttl: int, proxied: bool) -> dict[str, Any]:
     payload = {
-        "type": record_type.upper(),
+        "type": record_type,
         "name": name,
         "content": content,
         "ttl": ttl,
         "proxied": proxied,
     }
-    resp = requests.put(f"{API_BASE}/zones/{zone_id}/dns_records/{record_id}", headers=headers, json=payload, timeout=15)
+    resp = _session().put(f"{API_BASE}/zones/{zone_id}/dns_records/{record_id}", headers=headers, json=payload, timeout=15)
     data = _handle(resp)
     return data["result"]
 
+
+# Cloudflare caps the number of record operations accepted in one batch request
+BATCH_LIMIT = 200
+
+
+def list_all_dns_records(headers: dict[str, str], zone_id: str, record_type: str | None = None, per_page: int = 5000) -> list[dict[str, Any]]:
+    params: dict[str, Any] = {"per_page": per_page, "page": 1}
+    if record_type:
+        params["type"] = record_type
+    records: list[dict[str, Any]] = []
+    while True:
+        resp = _session().get(f"{API_BASE}/zones/{zone_id}/dns_records", headers=headers, params=params, timeout=15)
+        data = _handle(resp)
+        records.extend(data.get("result", []))
+        total_pages = (data.get("result_info") or {}).get("total_pages", 1)
+        if params["page"] >= total_pages:
+            return records
+        params["page"] += 1
+
+
+def batch_dns_records(
+    headers: dict[str, str],
+    zone_id: str,
+    patches: list[dict[str, Any]] | None = None,
+    posts: list[dict[str, Any]] | None = None,
+    deletes: list[dict[str, Any]] | None = None,
+) -> dict[str, Any]:
+    payload = {
+        "deletes": deletes or [],
+        "patches": patches or [],
+        "posts": posts or [],
+    }
+    resp = _session().post(f"{API_BASE}/zones/{zone_id}/dns_records/batch", headers=headers, json=payload, timeout=15)
+    data = _handle(resp)
+    return data["result"]
@@ -1,21 +1,24 @@
 from __future__ import annotations
 import os
-from dataclasses import dataclass
-from dotenv import load_dotenv
-from typing import List
+from dataclasses import dataclass, field
+
+from ._util import split_csv
 
 ENV_LOADED = False
+RECORD_TYPES = frozenset({"A", "AAAA"})
 
 
 def load_env(path: str | None = None) -> None:
     global ENV_LOADED
     if ENV_LOADED:
         return
+    from dotenv import load_dotenv  # deferred: only needed once per process
+
     load_dotenv(dotenv_path=path)  # will silently ignore if not exists
     ENV_LOADED = True
 
 
-@dataclass
+@dataclass(slots=True)
 class Settings:
     # Auth: prefer API token over key/email
     api_token: str | None
@@ -29,9 +32,25 @@ class Settings:
     proxied: bool = False
     interval: int | None = None  # seconds; if None run once
     dry_run: bool = False
+    state_file: str | None = None  # persist last-known IPs here between runs
+    state_max_age: int = 3600  # seconds before a persisted IP is re-checked against Cloudflare
+    _auth_headers: dict[str, str] | None = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Normalized once here so API calls and comparisons can use it as-is
+        self.record_type = self.record_type.upper()
+        if self.record_type not in RECORD_TYPES:
+            raise ValueError("Record type must be A or AAAA")
 
     @property
     def auth_headers(self) -> dict[str, str]:
+        # Built on first use (several API calls per record), not at construction,
+        # so Settings without credentials can still be created
+        if self._auth_headers is None:
+            self._auth_headers = self._build_auth_headers()
+        return self._auth_headers
+
+    def _build_auth_headers(self) -> dict[str, str]:
         if self.api_token:
             return {"Authorization": f"Bearer {self.api_token}"}
         if self.api_key and self.email:
@@ -45,10 +64,9 @@ def _parse_bool(val: str | None, default: bool = False) -> bool:
     return val.lower() in {"1", "true", "yes", "on"}
 
 
-def _split_csv(value: str | None) -> List[str]:
-    if not value:
-        return []
-    return [item.strip() for item in value.split(',') if item.strip()]
+def _state_file() -> str | None:
+    path = os.getenv("DDNS_STATE_FILE") or None
+    return os.path.expanduser(path) if path else None
 
 
 def load_settings(env_path: str | None = None) -> Settings:
@@ -69,6 +87,8 @@ def load_settings(env_path: str | None = None) -> Settings:
     interval_env = os.getenv("DDNS_INTERVAL") or None
     interval = int(interval_env) if interval_env else None
     dry_run = _parse_bool(os.getenv("DDNS_DRY_RUN"))
+    state_file = _state_file()
+    state_max_age = int(os.getenv("DDNS_STATE_MAX_AGE") or 3600)
 
     if not zone:
         raise ValueError("CLOUDFLARE_ZONE_NAME is required")
@@ -79,11 +99,13 @@ def load_settings(env_path: str | None = None) -> Settings:
         email=email,
         zone_name=zone,
         record_name=record,
-        record_type=record_type.upper(),
+        record_type=record_type,
         ttl=ttl,
         proxied=proxied,
         interval=interval,
         dry_run=dry_run,
+        state_file=state_file,
+        state_max_age=state_max_age,
     )
 
 
@@ -105,7 +127,7 @@ def load_all_settings(env_path: str | None = None) -> list[Settings]:
     api_key = os.getenv("CLOUDFLARE_API_KEY") or None
     email = os.getenv("CLOUDFLARE_EMAIL") or None
 
-    zones = _split_csv(os.getenv("CLOUDFLARE_ZONE_NAMES"))
+    zones = split_csv(os.getenv("CLOUDFLARE_ZONE_NAMES"))
     single_zone = os.getenv("CLOUDFLARE_ZONE_NAME") or ""
     use_multi = len(zones) > 0
 
@@ -114,15 +136,17 @@ def load_all_settings(env_path: str | None = None) -> list[Settings]:
             raise ValueError("CLOUDFLARE_ZONE_NAME or CLOUDFLARE_ZONE_NAMES is required")
         zones = [single_zone]
 
-    record_names_multi = _split_csv(os.getenv("CLOUDFLARE_RECORD_NAMES"))
+    record_names_multi = split_csv(os.getenv("CLOUDFLARE_RECORD_NAMES"))
     global_record_name = os.getenv("CLOUDFLARE_RECORD_NAME") or None
 
-    record_type = (os.getenv("CLOUDFLARE_RECORD_TYPE") or "A").upper()
+    record_type = os.getenv("CLOUDFLARE_RECORD_TYPE") or "A"
     ttl = int(os.getenv("CLOUDFLARE_TTL") or 300)
     proxied = _parse_bool(os.getenv("CLOUDFLARE_PROXIED"))
     interval_env = os.getenv("DDNS_INTERVAL") or None
     interval = int(interval_env) if interval_env else None
     dry_run = _parse_bool(os.getenv("DDNS_DRY_RUN"))
+    state_file = _state_file()
+    state_max_age = int(os.getenv("DDNS_STATE_MAX_AGE") or 3600)
 
     if record_names_multi:
         if len(record_names_multi) != len(zones):
@@ -153,6 +177,8 @@ def load_all_settings(env_path: str | None = None) -> list[Settings]:
                 proxied=proxied,
                 interval=interval,
                 dry_run=dry_run,
+                state_file=state_file,
+                state_max_age=state_max_age,
             )
         )
     return settings_list
@@ -1,11 +1,14 @@
 from __future__ import annotations
-import re
-import requests
-from typing import Iterable
+import ipaddress
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Iterable
 
-_IPV4_RE = re.compile(r"^(?:\d{1,3}\.){3}\d{1,3}$")
-# Basic IPv6 validation (compressed forms included)
-_IPV6_RE = re.compile(r"^([0-9a-fA-F]{0,4}:){2,7}[0-9a-fA-F]{0,4}$")
+from .version import __version__
+
+if TYPE_CHECKING:
+    import requests
 
 _DEFAULT_IPV4_ENDPOINTS = [
     "https://ipv4.icanhazip.com/",
@@ -21,32 +24,109 @@ class IPDetectionError(RuntimeError):
     pass
 
 
+def _build_session() -> requests.Session:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util import Retry
+
+    # Separate pool from the Cloudflare API session (different hosts)
+    session = requests.Session()
+    retry = Retry(total=1, backoff_factor=0.2, status_forcelist=(500, 502, 503, 504), allowed_methods=frozenset({"GET"}))
+    session.mount("https://", HTTPAdapter(pool_connections=len(_DEFAULT_IPV4_ENDPOINTS) + len(_DEFAULT_IPV6_ENDPOINTS), pool_maxsize=4, max_retries=retry))
+    session.headers["User-Agent"] = f"cloudflare-ddns/{__version__}"
+    return session
+
+
+_SESSION: requests.Session | None = None
+_SESSION_LOCK = threading.Lock()
+
+
+def _session() -> requests.Session:
+    global _SESSION
+    if _SESSION is None:
+        with _SESSION_LOCK:
+            if _SESSION is None:
+                _SESSION = _build_session()
+    return _SESSION
+
+
+# url -> (ETag, body) of the last successful response, replayed on 304 Not Modified
+_ETAG_CACHE: dict[str, tuple[str, str]] = {}
+
+
 def _query(endpoints: Iterable[str]) -> str:
     last_err: Exception | None = None
     for url in endpoints:
+        cached = _ETAG_CACHE.get(url)
+        headers = {"If-None-Match": cached[0]} if cached else None
         try:
-            resp = requests.get(url, timeout=5)
-            if resp.ok:
-                return resp.text.strip()
+            # IP endpoints answer directly; a redirect means the endpoint is not usable
+            resp = _session().get(url, headers=headers, timeout=5, allow_redirects=False)
+            if resp.status_code == 304 and cached:
+                return cached[1]
+            if resp.status_code == 200:
+                # Bodies are a bare address; decoding explicitly skips charset detection
+                body = resp.content.decode("ascii", "replace").strip()
+                etag = resp.headers.get("ETag")
+                if etag:
+                    _ETAG_CACHE[url] = (etag, body)
+                return body
         except Exception as e:  # pragma: no cover - network errors
             last_err = e
             continue
     raise IPDetectionError(f"Unable to detect IP. Last error: {last_err}")
 
 
-def get_public_ip(record_type: str) -> str:
+# record type -> (time.monotonic() of detection, ip); shared by every caller in the process
+_IP_CACHE: dict[str, tuple[float, str]] = {}
+_IP_LOCKS = {"A": threading.Lock(), "AAAA": threading.Lock()}
+# How old (as a multiple of max_age) a cached IP may get while detection keeps failing
+MAX_STALE_FACTOR = 5
+
+
+def get_public_ip(record_type: str, max_age: float = 0) -> str:
+    """Return the current public IP for an A or AAAA record.
+
+    With max_age > 0 a value detected less than max_age seconds ago is reused
+    instead of querying again, concurrent callers wait for a single lookup, and
+    if a refresh fails the last known value is returned (with a warning) rather
+    than raising, as long as it is less than MAX_STALE_FACTOR * max_age old.
+    """
     rt = record_type.upper()
-    if rt == "A":
-        ip = _query(_DEFAULT_IPV4_ENDPOINTS)
-        if not _IPV4_RE.match(ip):
-            raise IPDetectionError(f"Invalid IPv4 detected: {ip}")
+    lock = _IP_LOCKS.get(rt)
+    if lock is None:
+        raise ValueError(f"Unsupported record type: {record_type}")
+    with lock:
+        cached = _IP_CACHE.get(rt)
+        if max_age > 0 and cached is not None and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+        try:
+            ip = _detect(rt)
+        except IPDetectionError as e:
+            if max_age > 0 and cached is not None:
+                age = time.monotonic() - cached[0]
+                if age < max_age * MAX_STALE_FACTOR:
+                    print(f"Warning: {e}; using {rt} address detected {age:.0f}s ago", file=sys.stderr)
+                    return cached[1]
+            raise
+        _IP_CACHE[rt] = (time.monotonic(), ip)
         return ip
+
+
+def _detect(rt: str) -> str:
+    if rt == "A":
+        return _validate(_query(_DEFAULT_IPV4_ENDPOINTS), ipaddress.IPv4Address, "IPv4")
     elif rt == "AAAA":
-        ip = _query(_DEFAULT_IPV6_ENDPOINTS)
-        # IPv6 regex is intentionally loose; additional validation could be added
-        if not _IPV6_RE.match(ip):
-            raise IPDetectionError(f"Invalid IPv6 detected: {ip}")
-        return ip
+        return _validate(_query(_DEFAULT_IPV6_ENDPOINTS), ipaddress.IPv6Address, "IPv6")
     else:
-        raise ValueError(f"Unsupported record type: {record_type}")
+        raise ValueError(f"Unsupported record type: {rt}")
+
 
+def _validate(ip: str, expected: type, label: str) -> str:
+    try:
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        raise IPDetectionError(f"Invalid {label} detected: {ip}") from None
+    if not isinstance(addr, expected):
+        raise IPDetectionError(f"Invalid {label} detected: {ip}")
+    return str(addr)
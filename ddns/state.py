@@ -0,0 +1,75 @@
+"""Last-known IP per record, persisted between runs.
+
+Lets one-shot (cron) invocations skip every Cloudflare call when the public IP
+has not changed since the previous run. The file is only an optimization: a
+missing or unreadable file simply means Cloudflare is checked again.
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any
+
+# Serializes read-modify-write cycles from concurrent zone updates
+_LOCK = threading.Lock()
+
+
+def state_key(zone_name: str, record_name: str, record_type: str) -> str:
+    return f"{zone_name}|{record_name}|{record_type}"
+
+
+def load_state(path: str) -> dict[str, Any]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_state(path: str, state: dict[str, Any]) -> None:
+    # Write a temp file next to the target and rename, so readers never see a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".ddns-state-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def fresh_ip(state: dict[str, Any], key: str, max_age: float, now: float | None = None) -> str | None:
+    """Return the stored IP for key if it was confirmed less than max_age seconds ago."""
+    entry = state.get(key)
+    if not isinstance(entry, dict):
+        return None
+    checked = entry.get("checked")
+    if not isinstance(checked, (int, float)):
+        return None
+    if (time.time() if now is None else now) - checked >= max_age:
+        return None
+    return entry.get("ip")
+
+
+def remember(path: str, entries: dict[str, str]) -> None:
+    """Record IPs that Cloudflare is now known to hold, stamped with the current time."""
+    if not entries:
+        return
+    with _LOCK:
+        state = load_state(path)
+        now = time.time()
+        for key, ip in entries.items():
+            state[key] = {"ip": ip, "checked": now}
+        try:
+            save_state(path, state)
+        except OSError as e:  # the update itself succeeded; only the shortcut is lost
+            print(f"Warning: could not write state file {path}: {e}", file=sys.stderr)
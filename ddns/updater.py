@@ -1,18 +1,84 @@
 from __future__ import annotations
+import math
 import time
-from typing import Callable, Any, Optional
+from contextlib import contextmanager
+from typing import Callable, Any, Iterator, Optional
 
 from .config import Settings
-from . import cloudflare
+from . import cloudflare, state
 
 Result = dict[str, Any]
+# (zone_id, record type) -> {lowercased record name: record}
+RecordCache = dict[tuple[str, str], dict[str, dict[str, Any]]]
+# Longest a loop stretches its interval (as a multiple) while Cloudflare is rate limiting
+MAX_BACKOFF_FACTOR = 8
 
 
-def run_once(settings: Settings, last_ip: str | None = None, ip_getter: Callable[[str], str] | None = None) -> Result:
+def rate_limit_delay(interval: int, previous_delay: int, err: cloudflare.CloudflareRateLimitError) -> int:
+    """Next sleep after a rate-limited cycle: double the last one, capped, never below Retry-After."""
+    delay = min(max(previous_delay, interval) * 2, interval * MAX_BACKOFF_FACTOR)
+    if err.retry_after:
+        delay = max(delay, math.ceil(err.retry_after))
+    return delay
+
+
+@contextmanager
+def _forget_zone_on_error(settings: Settings) -> Iterator[None]:
+    # The zone ID is memoized; an API failure may mean it is stale, so look it up again next time
+    try:
+        yield
+    except cloudflare.CloudflareRateLimitError:
+        raise  # throttling says nothing about the zone ID
+    except cloudflare.CloudflareAPIError:
+        cloudflare.forget_zone_id(settings.auth_headers, settings.zone_name)
+        raise
+
+
+def _state_ip(settings: Settings, persisted: dict[str, Any]) -> str | None:
+    key = state.state_key(settings.zone_name, settings.record_name, settings.record_type)
+    return state.fresh_ip(persisted, key, settings.state_max_age)
+
+
+def _remember(pairs: list[tuple[Settings, Result]]) -> None:
+    # Persist only IPs Cloudflare is confirmed to hold (not dry runs or in-memory noops)
+    by_path: dict[str, dict[str, str]] = {}
+    for s, result in pairs:
+        if not s.state_file:
+            continue
+        if result["action"] in {"created", "updated"} or result.get("reason") == "unchanged-remote":
+            key = state.state_key(s.zone_name, s.record_name, s.record_type)
+            by_path.setdefault(s.state_file, {})[key] = result["ip"]
+    for path, entries in by_path.items():
+        state.remember(path, entries)
+
+
+def _find_record(settings: Settings, zone_id: str, record_cache: RecordCache | None) -> Optional[dict[str, Any]]:
+    if record_cache is None:
+        return cloudflare.find_dns_record(settings.auth_headers, zone_id, settings.record_type, settings.record_name)
+    key = (zone_id, settings.record_type)
+    if key not in record_cache:
+        # One listing of this type covers every record name in the zone
+        index: dict[str, dict[str, Any]] = {}
+        for record in cloudflare.list_all_dns_records(settings.auth_headers, zone_id, settings.record_type):
+            index.setdefault(record["name"].lower(), record)
+        record_cache[key] = index
+    return record_cache[key].get(settings.record_name.lower())
+
+
+def run_once(
+    settings: Settings,
+    last_ip: str | None = None,
+    ip_getter: Callable[[str], str] | None = None,
+    record_cache: RecordCache | None = None,
+) -> Result:
     """Run a single update cycle.
 
     Returns a result dict with keys: action (created|updated|noop), ip, record_id (if known).
     ip_getter is optional to simplify testing; if None it's resolved at call time so monkeypatching works.
+    record_cache, when given, is filled with one record listing per zone and type and reused by
+    later calls sharing it, instead of a filtered lookup per record.
+    When settings.state_file is set, an IP confirmed there within state_max_age seconds
+    also short-circuits (reason "unchanged-state"), covering runs without a last_ip.
     """
     if ip_getter is None:
         from .ip import get_public_ip as _get_public_ip  # local import so tests can patch ddns.ip.get_public_ip
@@ -23,10 +89,18 @@ def run_once(settings: Settings, last_ip: str | None = None, ip_getter: Callable
     # Short-circuit if IP unchanged (when last_ip provided)
     if last_ip and last_ip == current_ip:
         return {"action": "noop", "ip": current_ip, "reason": "unchanged-cached"}
+    if settings.state_file and _state_ip(settings, state.load_state(settings.state_file)) == current_ip:
+        return {"action": "noop", "ip": current_ip, "reason": "unchanged-state"}
 
-    zone_id = cloudflare.get_zone_id(settings.auth_headers, settings.zone_name)
-    record = cloudflare.find_dns_record(settings.auth_headers, zone_id, settings.record_type, settings.record_name)
+    with _forget_zone_on_error(settings):
+        zone_id = cloudflare.get_zone_id(settings.auth_headers, settings.zone_name)
+        record = _find_record(settings, zone_id, record_cache)
+        result = _apply(settings, zone_id, record, current_ip)
+    _remember([(settings, result)])
+    return result
 
+
+def _apply(settings: Settings, zone_id: str, record: Optional[dict[str, Any]], current_ip: str) -> Result:
     if record:
         if record.get("content") == current_ip:
             return {"action": "noop", "ip": current_ip, "record_id": record.get("id"), "reason": "unchanged-remote"}
@@ -58,6 +132,103 @@ def run_once(settings: Settings, last_ip: str | None = None, ip_getter: Callable
         return {"action": "created", "ip": current_ip, "record_id": created.get("id")}
 
 
+def run_zone(
+    settings_group: list[Settings],
+    ip_getter: Callable[[str], str] | None = None,
+    last_ips: dict[tuple[str, str], str] | None = None,
+) -> list[Result]:
+    """Run a single update cycle for several records that share one zone.
+
+    The zone is looked up once, its records are listed once and
+    every required change is submitted through the batch endpoint, instead of a
+    lookup/find/write round trip per record. Results are returned in the same
+    order as settings_group, using the same shape as run_once. If Cloudflare
+    rejects a batch, the affected records fall back to individual writes; a
+    record failing there gets an "error" action with the exception under "error".
+    last_ips maps (zone_name, record_name) to the IP seen on a previous cycle; records
+    whose IP is unchanged are skipped as in run_once, and a zone with nothing left to
+    check makes no API calls.
+    """
+    if not settings_group:
+        return []
+    if ip_getter is None:
+        from .ip import get_public_ip as _get_public_ip
+        ip_getter = _get_public_ip
+
+    first = settings_group[0]
+    with _forget_zone_on_error(first):
+        return _run_zone(settings_group, ip_getter, last_ips or {})
+
+
+def _run_zone(settings_group: list[Settings], ip_getter: Callable[[str], str], last_ips: dict[tuple[str, str], str]) -> list[Result]:
+    results: list[Result | None] = [None] * len(settings_group)
+    current_ips = [ip_getter(s.record_type) for s in settings_group]
+    persisted = {path: state.load_state(path) for path in {s.state_file for s in settings_group if s.state_file}}
+    for i, s in enumerate(settings_group):
+        if last_ips.get((s.zone_name, s.record_name)) == current_ips[i]:
+            results[i] = {"action": "noop", "ip": current_ips[i], "reason": "unchanged-cached"}
+        elif s.state_file and _state_ip(s, persisted[s.state_file]) == current_ips[i]:
+            results[i] = {"action": "noop", "ip": current_ips[i], "reason": "unchanged-state"}
+    if all(results):
+        return results  # type: ignore[return-value]
+
+    first = settings_group[0]
+    headers = first.auth_headers
+    zone_id = cloudflare.get_zone_id(headers, first.zone_name)
+    record_cache: RecordCache = {}
+
+    # Pending writes: (index into settings_group, "patches" | "posts", payload)
+    pending: list[tuple[int, str, dict[str, Any]]] = []
+    for i, s in enumerate(settings_group):
+        if results[i]:
+            continue
+        current_ip = current_ips[i]
+        record = _find_record(s, zone_id, record_cache)
+        if record:
+            if record.get("content") == current_ip:
+                results[i] = {"action": "noop", "ip": current_ip, "record_id": record.get("id"), "reason": "unchanged-remote"}
+            elif s.dry_run:
+                results[i] = {"action": "update-skip-dry-run", "ip": current_ip, "record_id": record.get("id")}
+            else:
+                pending.append((i, "patches", {"id": record["id"], "content": current_ip, "ttl": s.ttl, "proxied": s.proxied}))
+        else:
+            if s.dry_run:
+                results[i] = {"action": "create-skip-dry-run", "ip": current_ip}
+            else:
+                pending.append((i, "posts", {"type": s.record_type, "name": s.record_name, "content": current_ip, "ttl": s.ttl, "proxied": s.proxied}))
+
+    for start in range(0, len(pending), cloudflare.BATCH_LIMIT):
+        chunk = pending[start:start + cloudflare.BATCH_LIMIT]
+        patches = [payload for _, kind, payload in chunk if kind == "patches"]
+        posts = [payload for _, kind, payload in chunk if kind == "posts"]
+        try:
+            applied = cloudflare.batch_dns_records(headers, zone_id, patches=patches, posts=posts)
+        except cloudflare.CloudflareRateLimitError:
+            raise  # per-record fallback would only add to the throttling
+        except cloudflare.CloudflareAPIError:
+            # Batch rejected (plan limits, validation, ...): retry these records one by one
+            # (zone ID and listing are in hand; state is saved once for the group below)
+            for i, _, payload in chunk:
+                s = settings_group[i]
+                try:
+                    results[i] = _apply(s, zone_id, _find_record(s, zone_id, record_cache), payload["content"])
+                except cloudflare.CloudflareRateLimitError:
+                    raise
+                except Exception as e:  # keep the records already written in this fallback
+                    results[i] = {"action": "error", "ip": payload["content"], "error": e}
+            continue
+        applied_iters = {"patches": iter(applied.get("patches") or []), "posts": iter(applied.get("posts") or [])}
+        for i, kind, payload in chunk:
+            written = next(applied_iters[kind], {})
+            results[i] = {
+                "action": "updated" if kind == "patches" else "created",
+                "ip": payload["content"],
+                "record_id": written.get("id", payload.get("id")),
+            }
+    _remember(list(zip(settings_group, results)))  # type: ignore[arg-type]
+    return results  # type: ignore[return-value]
+
+
 def run_loop(settings: Settings, sleep_fn: Callable[[int], None] = time.sleep, ip_getter: Callable[[str], str] | None = None, verbose: bool = False) -> None:
     if not settings.interval:
         run_once(settings, ip_getter=ip_getter)
@@ -68,6 +239,7 @@ def run_loop(settings: Settings, sleep_fn: Callable[[int], None] = time.sleep, i
         from .ip import get_public_ip as _get_public_ip
         ip_getter = _get_public_ip
 
+    delay = settings.interval
     while True:  # pragma: no cover - loop control tested indirectly
         iteration += 1
         try:
@@ -82,6 +254,11 @@ def run_loop(settings: Settings, sleep_fn: Callable[[int], None] = time.sleep, i
 
             result = run_once(settings, last_ip=last_ip, ip_getter=lambda rt: current_ip)
             last_ip = result.get("ip")
+            delay = settings.interval
+        except cloudflare.CloudflareRateLimitError as e:
+            delay = rate_limit_delay(settings.interval, delay, e)
+            if verbose:
+                print(f"Rate limited by Cloudflare; next check in {delay}s")
         except Exception:  # log & continue; simplistic handling
             pass
-        sleep_fn(settings.interval)
+        sleep_fn(delay)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+# Imported at collection time so every test (including the first) patches modules
+# already in sys.modules instead of paying their import cost mid-test
+from ddns import cloudflare as cf, ip as ddns_ip, updater  # noqa: F401
+
+
+class CloudflareStub:
+    """Canned answers served by the patched zone, record and IP lookups."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.zone_id = "zone123"
+        self.record = None
+        self.ip = "1.2.3.4"
+
+
+@pytest.fixture(scope="module")
+def _cloudflare_stubs():
+    # Installed once per module; tests tweak the holder instead of re-patching
+    stub = CloudflareStub()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(cf, "get_zone_id", lambda *a, **k: stub.zone_id, raising=True)
+        mp.setattr(cf, "find_dns_record", lambda *a, **k: stub.record, raising=True)
+        mp.setattr(ddns_ip, "get_public_ip", lambda rt, *a, **k: stub.ip, raising=True)
+        yield stub
+
+
+@pytest.fixture
+def cf_stub(_cloudflare_stubs):
+    _cloudflare_stubs.reset()
+    return _cloudflare_stubs
+
+
+@pytest.fixture
+def patch_many(monkeypatch):
+    """Patch several attributes of one module in one call: patch_many(cf, name=value, ...)."""
+    def _patch(target, **attrs):
+        for name, value in attrs.items():
+            monkeypatch.setattr(target, name, value, raising=True)
+    return _patch
+
+
+class FakeResponse:
+    """Just enough of requests.Response for _handle and the ETag/IP code paths."""
+
+    def __init__(self, data=None, status_code=200, headers=None, content=None):
+        if content is None:
+            content = b"" if data is None else json.dumps(data).encode()
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Stands in for a module's pooled requests.Session; get/post are plain callables."""
+
+    def __init__(self, get=None, post=None):
+        self.get = get
+        self.post = post
+
+
+@pytest.fixture
+def fake_response():
+    return FakeResponse
+
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    """Install a FakeSession as module._SESSION: fake_session(cf, get=..., post=...)."""
+    def _install(module, get=None, post=None):
+        monkeypatch.setattr(module, "_SESSION", FakeSession(get=get, post=post), raising=True)
+    return _install
@@ -0,0 +1,82 @@
+import pytest
+from ddns import cloudflare
+
+
+def test_get_zone_id_is_memoized(monkeypatch, fake_session, fake_response):
+    monkeypatch.setattr(cloudflare, "_ZONE_ID_CACHE", {})
+    calls = []
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        calls.append(params["name"])
+        return fake_response({"success": True, "result": [{"id": "zone-" + params["name"]}]})
+
+    fake_session(cloudflare, get=fake_get)
+    headers = {"Authorization": "Bearer tok"}
+    assert cloudflare.get_zone_id(headers, "example.com") == "zone-example.com"
+    assert cloudflare.get_zone_id(headers, "example.com") == "zone-example.com"
+    assert calls == ["example.com"]
+
+    cloudflare.forget_zone_id(headers, "example.com")
+    cloudflare.get_zone_id(headers, "example.com")
+    assert calls == ["example.com", "example.com"]
+
+
+def test_handle_raises_typed_rate_limit_error(fake_response):
+    resp = fake_response({"success": False, "errors": [{"code": 10000}]}, status_code=429, headers={"Retry-After": "30"})
+    with pytest.raises(cloudflare.CloudflareRateLimitError) as excinfo:
+        cloudflare._handle(resp)
+    assert excinfo.value.retry_after == 30.0
+    assert isinstance(excinfo.value, cloudflare.CloudflareAPIError)
+
+
+def test_session_retries_post_only_when_unprocessed():
+    retry = cloudflare._build_session().get_adapter(cloudflare.API_BASE).max_retries
+    assert retry.is_retry("GET", 502)
+    assert retry.is_retry("PUT", 504)
+    assert retry.is_retry("POST", 429)
+    assert retry.is_retry("POST", 503)
+    # The write may already have landed; resending would fail as a duplicate
+    assert not retry.is_retry("POST", 502)
+    assert not retry.is_retry("POST", 504)
+    # Retry objects are re-created on every attempt; the subclass must survive that
+    assert not retry.increment("POST", cloudflare.API_BASE).is_retry("POST", 502)
+
+
+def test_list_all_dns_records_follows_pages(fake_session, fake_response):
+    pages = []
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        pages.append(dict(params))
+        page = params["page"]
+        return fake_response({"success": True, "result": [{"id": f"rec{page}"}], "result_info": {"total_pages": 3}})
+
+    fake_session(cloudflare, get=fake_get)
+    records = cloudflare.list_all_dns_records({}, "zone123", "A")
+    assert [r["id"] for r in records] == ["rec1", "rec2", "rec3"]
+    assert pages == [{"per_page": 5000, "page": n, "type": "A"} for n in (1, 2, 3)]
+
+
+def test_find_dns_record_replays_on_not_modified(monkeypatch, fake_session, fake_response):
+    monkeypatch.setattr(cloudflare, "_RECORD_ETAG_CACHE", {})
+    sent = []
+    record = {"id": "rec1", "content": "1.2.3.4"}
+    responses = [
+        fake_response({"success": True, "result": [record]}, headers={"ETag": '"v1"'}),
+        fake_response(status_code=304),
+        fake_response({"success": True, "result": []}, headers={"ETag": '"v2"'}),
+        fake_response(status_code=304),
+    ]
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        sent.append(headers.get("If-None-Match"))
+        return responses.pop(0)
+
+    fake_session(cloudflare, get=fake_get)
+    headers = {"Authorization": "Bearer tok"}
+    assert cloudflare.find_dns_record(headers, "zone123", "A", "home.example.com") == record
+    assert cloudflare.find_dns_record(headers, "zone123", "A", "home.example.com") == record
+    # A missing record is cached too, so its 304 replays None
+    assert cloudflare.find_dns_record(headers, "zone123", "A", "new.example.com") is None
+    assert cloudflare.find_dns_record(headers, "zone123", "A", "new.example.com") is None
+    assert sent == [None, '"v1"', None, '"v2"']
+    assert "If-None-Match" not in headers
@@ -1,5 +1,6 @@
 import os
 import importlib
+import pytest
 from ddns.config import load_settings
 
 
@@ -41,3 +42,11 @@ def test_missing_zone_raises(monkeypatch):
     else:  # pragma: no cover
         raise AssertionError("Expected exception not raised")
 
+
+def test_record_type_normalized_and_validated(monkeypatch):
+    monkeypatch.setenv("CLOUDFLARE_ZONE_NAME", "example.com")
+    monkeypatch.setenv("CLOUDFLARE_RECORD_TYPE", "aaaa")
+    assert load_settings().record_type == "AAAA"
+    monkeypatch.setenv("CLOUDFLARE_RECORD_TYPE", "CNAME")
+    with pytest.raises(ValueError, match="A or AAAA"):
+        load_settings()
@@ -0,0 +1,78 @@
+import time
+import pytest
+from ddns import ip
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache(monkeypatch):
+    monkeypatch.setattr(ip, "_IP_CACHE", {})
+
+
+def test_get_public_ip_reuses_fresh_value(monkeypatch):
+    calls = []
+
+    def fake_detect(rt):
+        calls.append(rt)
+        return "1.2.3.4"
+
+    monkeypatch.setattr(ip, "_detect", fake_detect)
+    assert ip.get_public_ip("A", max_age=60) == "1.2.3.4"
+    assert ip.get_public_ip("a", max_age=60) == "1.2.3.4"
+    assert calls == ["A"]
+    # Without max_age every call queries again
+    ip.get_public_ip("A")
+    assert calls == ["A", "A"]
+
+
+def test_get_public_ip_serves_stale_value_on_failure(monkeypatch, capsys):
+    monkeypatch.setattr(ip, "_IP_CACHE", {"A": (time.monotonic() - 2, "5.6.7.8")})
+
+    def failing_detect(rt):
+        raise ip.IPDetectionError("offline")
+
+    monkeypatch.setattr(ip, "_detect", failing_detect)
+    assert ip.get_public_ip("A", max_age=1) == "5.6.7.8"
+    assert "offline" in capsys.readouterr().err
+    with pytest.raises(ip.IPDetectionError):
+        ip.get_public_ip("A")
+    # Too old to stand in for a failed detection any more
+    with pytest.raises(ip.IPDetectionError):
+        ip.get_public_ip("A", max_age=2 / ip.MAX_STALE_FACTOR)
+
+
+@pytest.mark.parametrize("rt,body,expected", [
+    ("A", "203.0.113.7", "203.0.113.7"),
+    ("AAAA", "2001:DB8::1", "2001:db8::1"),
+    ("AAAA", "::1", "::1"),
+])
+def test_detect_accepts_valid_addresses(monkeypatch, rt, body, expected):
+    monkeypatch.setattr(ip, "_query", lambda endpoints: body)
+    assert ip.get_public_ip(rt) == expected
+
+
+@pytest.mark.parametrize("rt,body", [
+    ("A", "999.1.1.1"),
+    ("A", "2001:db8::1"),
+    ("AAAA", "203.0.113.7"),
+    ("AAAA", "1:2:3:4:5:6:7:8:9"),
+    ("A", "<html>error</html>"),
+])
+def test_detect_rejects_invalid_addresses(monkeypatch, rt, body):
+    monkeypatch.setattr(ip, "_query", lambda endpoints: body)
+    with pytest.raises(ip.IPDetectionError):
+        ip.get_public_ip(rt)
+
+
+def test_query_replays_body_on_not_modified(monkeypatch, fake_session, fake_response):
+    monkeypatch.setattr(ip, "_ETAG_CACHE", {})
+    sent = []
+    responses = [fake_response(content=b"1.2.3.4\n", headers={"ETag": '"v1"'}), fake_response(status_code=304)]
+
+    def fake_get(url, headers=None, timeout=None, allow_redirects=True):
+        sent.append(headers)
+        return responses.pop(0)
+
+    fake_session(ip, get=fake_get)
+    assert ip._query(["https://ip.example/"]) == "1.2.3.4"
+    assert ip._query(["https://ip.example/"]) == "1.2.3.4"
+    assert sent == [None, {"If-None-Match": '"v1"'}]
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from ddns import __main__ as cli, ip as ddns_ip
+from ddns.config import Settings
+
+
+def _settings(zone, record=None):
+    return Settings(api_token="tok", api_key=None, email=None, zone_name=zone, record_name=record or zone)
+
+
+def test_update_zones_isolates_failing_zone(monkeypatch, capsys):
+    def fake_run_zone(group, ip_getter=None, last_ips=None):
+        if group[0].zone_name == "a.com":
+            time.sleep(0.05)  # finishes last, yet is still reported first
+        if group[0].zone_name == "b.com":
+            raise RuntimeError("zone down")
+        return [{"action": "noop", "ip": "1.2.3.4"} for _ in group]
+
+    monkeypatch.setattr(cli, "run_zone", fake_run_zone)
+    zones = cli._group_by_zone([_settings("a.com"), _settings("b.com"), _settings("c.com")])
+    errors = cli._update_zones(zones, lambda rt: "1.2.3.4", verbose=True)
+    assert [str(e) for e in errors] == ["zone down"]
+    out, err = capsys.readouterr()
+    assert [line.split()[0] for line in out.splitlines()] == ["a.com", "c.com"]
+    assert "Error updating b.com: zone down" in err
+
+
+def test_update_zones_reports_error_results_per_record(monkeypatch, capsys):
+    failure = RuntimeError("invalid record")
+
+    def fake_run_zone(group, ip_getter=None, last_ips=None):
+        return [{"action": "error", "ip": "1.2.3.4", "error": failure}, {"action": "updated", "ip": "1.2.3.4", "record_id": "r2"}]
+
+    monkeypatch.setattr(cli, "run_zone", fake_run_zone)
+    zones = cli._group_by_zone([_settings("a.com", "x.a.com"), _settings("a.com", "y.a.com")])
+    assert cli._update_zones(zones, lambda rt: "1.2.3.4", verbose=True) == [failure]
+    out, err = capsys.readouterr()
+    assert "Error updating a.com/x.a.com: invalid record" in err
+    assert "y.a.com A -> updated" in out
+
+
+def test_run_multi_once_looks_up_ip_once_per_type(monkeypatch):
+    lookups = []
+    lock = threading.Lock()
+
+    def fake_get_public_ip(rt, max_age=0):
+        with lock:
+            lookups.append(rt)
+        time.sleep(0.01)  # widen the window for concurrent workers
+        return "1.2.3.4"
+
+    def fake_run_zone(group, ip_getter=None, last_ips=None):
+        return [{"action": "noop", "ip": ip_getter(s.record_type)} for s in group]
+
+    monkeypatch.setattr(ddns_ip, "get_public_ip", fake_get_public_ip)
+    monkeypatch.setattr(cli, "run_zone", fake_run_zone)
+    settings_list = [_settings(f"z{n}.com") for n in range(6)]
+    assert cli._run_multi_once(settings_list, verbose=False) == 0
+    assert lookups == ["A"]
+
+
+def test_run_multi_once_exit_code_on_zone_failure(monkeypatch):
+    def fake_run_zone(group, ip_getter=None, last_ips=None):
+        if group[0].zone_name == "b.com":
+            raise RuntimeError("zone down")
+        return [{"action": "noop", "ip": "1.2.3.4"} for _ in group]
+
+    monkeypatch.setattr(ddns_ip, "get_public_ip", lambda rt, max_age=0: "1.2.3.4")
+    monkeypatch.setattr(cli, "run_zone", fake_run_zone)
+    assert cli._run_multi_once([_settings("a.com"), _settings("b.com")], verbose=False) == 1
+
+
+def test_update_zones_tracks_last_ips_for_successes_only(monkeypatch):
+    failure = RuntimeError("invalid record")
+
+    def fake_run_zone(group, ip_getter=None, last_ips=None):
+        return [{"action": "updated", "ip": "5.6.7.8", "record_id": "r1"}, {"action": "error", "ip": "5.6.7.8", "error": failure}]
+
+    monkeypatch.setattr(cli, "run_zone", fake_run_zone)
+    zones = cli._group_by_zone([_settings("a.com", "x.a.com"), _settings("a.com", "y.a.com")])
+    last_ips = {("a.com", "y.a.com"): "1.2.3.4"}
+    cli._update_zones(zones, lambda rt: "5.6.7.8", verbose=False, last_ips=last_ips)
+    # The failed record keeps its old IP, so the next tick checks it again
+    assert last_ips == {("a.com", "x.a.com"): "5.6.7.8", ("a.com", "y.a.com"): "1.2.3.4"}
@@ -1,5 +1,7 @@
 import pytest
-from ddns.config import load_all_settings
+from ddns.__main__ import _apply_multi_overrides, _apply_single_overrides, build_parser
+from ddns._util import split_csv
+from ddns.config import Settings, load_all_settings
 
 
 def _clear(monkeypatch):
@@ -63,3 +65,68 @@ def test_single_zone_multi_record_names(monkeypatch):
     # All zones should replicate the single zone name
     assert all(s.zone_name == "solo.com" for s in settings_list)
     assert [s.record_name for s in settings_list] == ["solo.com", "host1.solo.com", "host2.solo.com"]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        (None, []),
+        ("", []),
+        ("a.com,b.com", ["a.com", "b.com"]),
+        ("a.com,,b.com,", ["a.com", "b.com"]),
+        (" a.com , b.com ", ["a.com", "b.com"]),
+        ("a.com,b.com\r", ["a.com", "b.com"]),
+        ("a.com\t,\fb.com\v", ["a.com", "b.com"]),
+        ("a.com,\u00a0b.com\u2028", ["a.com", "b.com"]),
+        (" , ", []),
+    ],
+)
+def test_split_csv(value, expected):
+    assert split_csv(value) == expected
+
+
+@pytest.mark.parametrize("value", ["a.com,b.com", "a.com,,b.com,", ",x,"])
+def test_split_csv_fast_path_matches_regex_split(value):
+    # The no-whitespace shortcut must agree with the general trimming split
+    assert split_csv(value) == split_csv(f" {value}\r")
+
+
+def _env_settings(*zones):
+    return [Settings(api_token="tok", api_key=None, email=None, zone_name=z, record_name=z) for z in zones]
+
+
+def test_multi_overrides_zones_replace_env_list():
+    args = build_parser().parse_args(["--zones", "a.com, b.com", "--type", "aaaa", "--ttl", "60", "--dry-run"])
+    settings_list = _apply_multi_overrides(_env_settings("env.com"), args)
+    assert [(s.zone_name, s.record_name) for s in settings_list] == [("a.com", "a.com"), ("b.com", "b.com")]
+    assert all(s.record_type == "AAAA" and s.ttl == 60 and s.dry_run for s in settings_list)
+    assert all(s.api_token == "tok" for s in settings_list)
+
+
+def test_multi_overrides_record_names():
+    parse = build_parser().parse_args
+    paired = _apply_multi_overrides(_env_settings("env.com"), parse(["--zones", "a.com,b.com", "--records", "x.a.com,y.b.com"]))
+    assert [s.record_name for s in paired] == ["x.a.com", "y.b.com"]
+    shared = _apply_multi_overrides(_env_settings("env.com"), parse(["--zones", "a.com,b.com", "--record", "dyn.example"]))
+    assert [s.record_name for s in shared] == ["dyn.example", "dyn.example"]
+    with pytest.raises(ValueError, match="--records count"):
+        _apply_multi_overrides(_env_settings("env.com"), parse(["--zones", "a.com,b.com", "--records", "x.a.com"]))
+
+
+def test_multi_overrides_without_changes_keep_list():
+    settings_list = _env_settings("a.com", "b.com")
+    assert _apply_multi_overrides(settings_list, build_parser().parse_args([])) is settings_list
+    proxied = _apply_multi_overrides(settings_list, build_parser().parse_args(["--proxied", "--interval", "30"]))
+    assert [s.zone_name for s in proxied] == ["a.com", "b.com"]
+    assert all(s.proxied and s.interval == 30 for s in proxied)
+    # dry_run from the environment survives when --dry-run is absent
+    dry = [Settings(api_token="tok", api_key=None, email=None, zone_name="a.com", record_name="a.com", dry_run=True)]
+    assert _apply_multi_overrides(dry, build_parser().parse_args(["--ttl", "60"]))[0].dry_run
+
+
+def test_single_overrides():
+    base = _env_settings("env.com")[0]
+    settings = _apply_single_overrides(base, build_parser().parse_args(["--zone", "z.com", "--no-proxied"]))
+    assert (settings.zone_name, settings.record_name, settings.proxied) == ("z.com", "env.com", False)
+    with pytest.raises(ValueError, match="A or AAAA"):
+        _apply_single_overrides(base, build_parser().parse_args(["--type", "MX"]))
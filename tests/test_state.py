@@ -0,0 +1,25 @@
+import json
+from ddns import state
+
+
+def test_remember_and_fresh_ip_round_trip(tmp_path):
+    path = str(tmp_path / "nested" / "state.json")
+    key = state.state_key("example.com", "home.example.com", "A")
+    state.remember(path, {key: "1.2.3.4"})
+
+    persisted = state.load_state(path)
+    assert state.fresh_ip(persisted, key, max_age=3600) == "1.2.3.4"
+    # Entries older than max_age are ignored so Cloudflare gets re-checked
+    assert state.fresh_ip(persisted, key, max_age=3600, now=persisted[key]["checked"] + 3600) is None
+    assert state.fresh_ip(persisted, "other|key|A", max_age=3600) is None
+    # Only the target file is left behind (temp file renamed into place)
+    assert [p.name for p in (tmp_path / "nested").iterdir()] == ["state.json"]
+
+
+def test_load_state_tolerates_missing_or_corrupt_file(tmp_path):
+    assert state.load_state(str(tmp_path / "missing.json")) == {}
+    bad = tmp_path / "bad.json"
+    bad.write_text("{not json")
+    assert state.load_state(str(bad)) == {}
+    bad.write_text(json.dumps(["not", "a", "dict"]))
+    assert state.load_state(str(bad)) == {}
@@ -1,102 +1,219 @@
-from ddns.updater import run_once
+from dataclasses import replace
+
+import pytest
+from ddns import cloudflare as cf, state
 from ddns.config import Settings
+from ddns.updater import rate_limit_delay, run_once, run_zone
+
+# Zone/record/IP lookups are stubbed once for the module (see conftest.py)
+pytestmark = pytest.mark.usefixtures("_cloudflare_stubs")
+
+
+# Built once; variants come from dataclasses.replace rather than a fresh constructor call.
+# A real Settings (not a SimpleNamespace stand-in): it is a plain slotted dataclass whose
+# only validation is the record_type check, and the updater relies on its auth_headers
+# property and defaulted fields (state_file, ...) that a namespace would silently lack.
+_BASE_SETTINGS = Settings(
+    api_token=None,
+    api_key="k",
+    email="e@example.com",
+    zone_name="example.com",
+    record_name="home.example.com",
+    record_type="A",
+    ttl=120,
+    proxied=False,
+    interval=None,
+    dry_run=False,
+)
 
 
-class DummySettings(Settings):
-    pass
+def make_settings(**overrides):
+    # Always a copy: run_once caches auth headers on the instance it is given
+    return replace(_BASE_SETTINGS, **overrides)
 
 
-def make_settings(**overrides):
-    base = dict(
-        api_token=None,
-        api_key="k",
-        email="e@example.com",
-        zone_name="example.com",
-        record_name="home.example.com",
-        record_type="A",
-        ttl=120,
-        proxied=False,
-        interval=None,
-        dry_run=False,
-    )
-    base.update(overrides)
-    return DummySettings(**base)
+# existing record, dry_run, detected ip, expected action, reason, record_id
+CASES = [
+    pytest.param(None, False, "1.2.3.4", "created", None, "rec123", id="create"),
+    pytest.param({"id": "rec1", "content": "1.1.1.1"}, False, "2.2.2.2", "updated", None, "rec1", id="update"),
+    pytest.param({"id": "rec1", "content": "3.3.3.3"}, False, "3.3.3.3", "noop", "unchanged-remote", "rec1", id="noop-remote"),
+    pytest.param(None, True, "5.5.5.5", "create-skip-dry-run", None, None, id="dry-run-create"),
+    pytest.param({"id": "rec5", "content": "6.6.6.6"}, True, "7.7.7.7", "update-skip-dry-run", None, "rec5", id="dry-run-update"),
+]
 
 
-def test_run_once_create(monkeypatch):
-    settings = make_settings()
-    monkeypatch.setattr("ddns.cloudflare.get_zone_id", lambda headers, zone: "zone123")
-    monkeypatch.setattr("ddns.cloudflare.find_dns_record", lambda *a, **k: None)
-    created = {}
+@pytest.mark.parametrize("existing,dry,ip,action,reason,record_id", CASES)
+def test_run_once(patch_many, cf_stub, existing, dry, ip, action, reason, record_id):
+    cf_stub.record = existing
+    cf_stub.ip = ip
 
     def fake_create(headers, zone_id, rt, name, content, ttl, proxied):
-        created.update({"content": content, "id": "rec123"})
-        return created
+        return {"id": "rec123", "content": content}
 
-    monkeypatch.setattr("ddns.cloudflare.create_dns_record", fake_create)
-    monkeypatch.setattr("ddns.ip.get_public_ip", lambda rt: "1.2.3.4")
+    def fake_update(headers, zone_id, rec_id, rt, name, content, ttl, proxied):
+        return {"id": rec_id, "content": content}
+
+    patch_many(cf, create_dns_record=fake_create, update_dns_record=fake_update)
+
+    result = run_once(make_settings(dry_run=dry))
+    assert result["action"] == action
+    assert result["ip"] == ip
+    assert result.get("record_id") == record_id
+    if reason:
+        assert result["reason"] == reason
+
+
+def test_run_once_noop_cached(patch_many, cf_stub):
+    # A matching last_ip must short-circuit before any Cloudflare round trip
+    def _boom(*a, **k):
+        raise AssertionError("cloudflare must not be called when cached IP matches")
+
+    patch_many(cf, get_zone_id=_boom, find_dns_record=_boom)
+    cf_stub.ip = "4.4.4.4"
+    result = run_once(make_settings(), last_ip="4.4.4.4")
+    assert result == {"action": "noop", "ip": "4.4.4.4", "reason": "unchanged-cached"}
+
+
+def test_run_zone_batches_changes(patch_many, cf_stub):
+    group = [
+        make_settings(record_name="example.com"),
+        make_settings(record_name="home.example.com"),
+        make_settings(record_name="new.example.com"),
+    ]
+    listing = [
+        {"id": "rec1", "type": "A", "name": "example.com", "content": "8.8.8.8"},
+        {"id": "rec2", "type": "A", "name": "home.example.com", "content": "1.1.1.1"},
+    ]
+    calls = []
+
+    def fake_batch(headers, zone_id, patches=None, posts=None, deletes=None):
+        calls.append((patches, posts))
+        return {"patches": [{"id": p["id"]} for p in patches], "posts": [{"id": "rec3"} for _ in posts]}
+
+    patch_many(
+        cf,
+        list_all_dns_records=lambda *a, **k: listing,
+        batch_dns_records=fake_batch,
+        find_dns_record=lambda *a, **k: pytest.fail("unexpected per-record lookup"),
+    )
+    cf_stub.ip = "8.8.8.8"
+
+    results = run_zone(group)
+    assert [r["action"] for r in results] == ["noop", "updated", "created"]
+    assert [r.get("record_id") for r in results] == ["rec1", "rec2", "rec3"]
+    assert len(calls) == 1
+    patches, posts = calls[0]
+    assert patches == [{"id": "rec2", "content": "8.8.8.8", "ttl": 120, "proxied": False}]
+    assert [p["name"] for p in posts] == ["new.example.com"]
+
+
+def test_run_zone_falls_back_when_batch_rejected(patch_many, cf_stub):
+    group = [make_settings(record_name="home.example.com")]
+    listing = [{"id": "rec1", "type": "A", "name": "home.example.com", "content": "1.1.1.1"}]
+
+    def reject(*a, **k):
+        raise cf.CloudflareAPIError("batch not allowed")
+
+    patch_many(
+        cf,
+        list_all_dns_records=lambda *a, **k: listing,
+        batch_dns_records=reject,
+        # The fallback reuses the zone listing instead of looking each record up again
+        find_dns_record=lambda *a, **k: pytest.fail("unexpected per-record lookup"),
+        update_dns_record=lambda headers, zone_id, rec_id, *a: {"id": rec_id},
+    )
+    cf_stub.ip = "9.9.9.9"
 
-    result = run_once(settings)
-    assert result["action"] == "created"
-    assert result["ip"] == "1.2.3.4"
-    assert result["record_id"] == "rec123"
+    results = run_zone(group)
+    assert results == [{"action": "updated", "ip": "9.9.9.9", "record_id": "rec1"}]
 
 
-def test_run_once_update(monkeypatch):
-    settings = make_settings()
-    monkeypatch.setattr("ddns.cloudflare.get_zone_id", lambda *a, **k: "zone123")
-    monkeypatch.setattr("ddns.cloudflare.find_dns_record", lambda *a, **k: {"id": "rec1", "content": "1.1.1.1"})
-    updated = {}
+def test_run_zone_isolates_fallback_failures(patch_many, cf_stub, tmp_path):
+    path = str(tmp_path / "state.json")
+    group = [make_settings(record_name=n, state_file=path) for n in ("a.example.com", "b.example.com", "c.example.com")]
+    saves = []
+    real_save = state.save_state
+
+    def reject(*a, **k):
+        raise cf.CloudflareAPIError("batch not allowed")
+
+    def fake_create(headers, zone_id, rt, record_name, *a):
+        if record_name == "a.example.com":
+            raise cf.CloudflareAPIError("invalid record")
+        return {"id": "rec-b"}
+
+    def counting_save(p, data):
+        saves.append(p)
+        real_save(p, data)
+
+    patch_many(cf, list_all_dns_records=lambda *a, **k: [], batch_dns_records=reject, create_dns_record=fake_create)
+    patch_many(state, save_state=counting_save)
+    first, second, third = run_zone(group)
+    assert first["action"] == "error"
+    assert str(first["error"]) == "invalid record"
+    assert second == {"action": "created", "ip": "1.2.3.4", "record_id": "rec-b"}
+    # The whole fallback persists in one write, and only what Cloudflare now holds
+    assert saves == [path]
+    assert sorted(state.load_state(path)) == [
+        state.state_key("example.com", n, "A") for n in ("b.example.com", "c.example.com")
+    ]
+
+
+def test_run_zone_splits_writes_at_batch_limit(cf_stub, fake_session, fake_response):
+    group = [make_settings(record_name=f"h{n}.example.com") for n in range(cf.BATCH_LIMIT + 1)]
+    batches = []
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        return fake_response({"success": True, "result": [], "result_info": {"total_pages": 1}})
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        batches.append(len(json["posts"]))
+        return fake_response({"success": True, "result": {"posts": [{"id": p["name"]} for p in json["posts"]]}})
+
+    fake_session(cf, get=fake_get, post=fake_post)
+    results = run_zone(group)
+    assert batches == [cf.BATCH_LIMIT, 1]
+    assert [r["record_id"] for r in results] == [s.record_name for s in group]
+
+
+def test_run_once_record_cache_lists_zone_once(patch_many):
+    listings = []
+
+    def fake_list(headers, zone_id, record_type=None):
+        listings.append((zone_id, record_type))
+        return [{"id": "rec1", "type": "A", "name": "Home.example.com", "content": "1.1.1.1"}]
+
+    patch_many(cf, list_all_dns_records=fake_list, find_dns_record=lambda *a, **k: pytest.fail("unexpected per-record lookup"))
+    record_cache = {}
+    for name in ("home.example.com", "HOME.example.com"):
+        result = run_once(make_settings(record_name=name), ip_getter=lambda rt: "1.1.1.1", record_cache=record_cache)
+        assert result["reason"] == "unchanged-remote"
+    # Listed once, filtered to the configured record type
+    assert listings == [("zone123", "A")]
+
+
+def test_run_once_state_file_skips_cloudflare(monkeypatch, cf_stub, tmp_path):
+    settings = make_settings(state_file=str(tmp_path / "state.json"))
+    cf_stub.record = {"id": "rec1", "content": "1.2.3.4"}
+    assert run_once(settings)["reason"] == "unchanged-remote"
+
+    # A later run (no in-memory last_ip) trusts the persisted confirmation
+    monkeypatch.setattr(cf, "get_zone_id", lambda *a, **k: pytest.fail("unexpected Cloudflare call"), raising=True)
+    assert run_once(settings)["reason"] == "unchanged-state"
+    assert run_zone([settings])[0]["reason"] == "unchanged-state"
+
+
+def test_run_zone_last_ips_skips_unchanged_zone(monkeypatch, cf_stub):
+    group = [make_settings(record_name="example.com"), make_settings(record_name="home.example.com")]
+    monkeypatch.setattr(cf, "get_zone_id", lambda *a, **k: pytest.fail("unexpected Cloudflare call"), raising=True)
+    last_ips = {("example.com", "example.com"): "1.2.3.4", ("example.com", "home.example.com"): "1.2.3.4"}
+    results = run_zone(group, last_ips=last_ips)
+    assert [r["reason"] for r in results] == ["unchanged-cached", "unchanged-cached"]
 
-    def fake_update(headers, zone_id, rec_id, rt, name, content, ttl, proxied):
-        updated.update({"id": rec_id, "content": content})
-        return updated
-
-    monkeypatch.setattr("ddns.cloudflare.update_dns_record", fake_update)
-    monkeypatch.setattr("ddns.ip.get_public_ip", lambda rt: "2.2.2.2")
-
-    result = run_once(settings)
-    assert result["action"] == "updated"
-    assert result["ip"] == "2.2.2.2"
-    assert result["record_id"] == "rec1"
-
-
-def test_run_once_noop_remote(monkeypatch):
-    settings = make_settings()
-    monkeypatch.setattr("ddns.cloudflare.get_zone_id", lambda *a, **k: "zone123")
-    monkeypatch.setattr("ddns.cloudflare.find_dns_record", lambda *a, **k: {"id": "rec1", "content": "3.3.3.3"})
-    monkeypatch.setattr("ddns.ip.get_public_ip", lambda rt: "3.3.3.3")
-    result = run_once(settings)
-    assert result["action"] == "noop"
-    assert result["reason"] == "unchanged-remote"
-
-
-def test_run_once_noop_cached(monkeypatch):
-    settings = make_settings()
-    # Should not call Cloudflare find if cached IP matches; but we allow calls; behavior returns noop with reason
-    monkeypatch.setattr("ddns.ip.get_public_ip", lambda rt: "4.4.4.4")
-    # Provide stubs anyway
-    monkeypatch.setattr("ddns.cloudflare.get_zone_id", lambda *a, **k: "zone123")
-    monkeypatch.setattr("ddns.cloudflare.find_dns_record", lambda *a, **k: {"id": "rec4", "content": "4.4.4.4"})
-    result = run_once(settings, last_ip="4.4.4.4")
-    assert result["action"] == "noop"
-    assert result["reason"] == "unchanged-cached"
-
-
-def test_run_once_dry_run_create(monkeypatch):
-    settings = make_settings(dry_run=True)
-    monkeypatch.setattr("ddns.cloudflare.get_zone_id", lambda *a, **k: "zone123")
-    monkeypatch.setattr("ddns.cloudflare.find_dns_record", lambda *a, **k: None)
-    monkeypatch.setattr("ddns.ip.get_public_ip", lambda rt: "5.5.5.5")
-    result = run_once(settings)
-    assert result["action"] == "create-skip-dry-run"
-
-
-def test_run_once_dry_run_update(monkeypatch):
-    settings = make_settings(dry_run=True)
-    monkeypatch.setattr("ddns.cloudflare.get_zone_id", lambda *a, **k: "zone123")
-    monkeypatch.setattr("ddns.cloudflare.find_dns_record", lambda *a, **k: {"id": "rec5", "content": "6.6.6.6"})
-    monkeypatch.setattr("ddns.ip.get_public_ip", lambda rt: "7.7.7.7")
-    result = run_once(settings)
-    assert result["action"] == "update-skip-dry-run"
 
+def test_rate_limit_delay_backs_off_with_cap():
+    err = cf.CloudflareRateLimitError("slow down")
+    assert rate_limit_delay(60, 60, err) == 120
+    assert rate_limit_delay(60, 120, err) == 240
+    assert rate_limit_delay(60, 480, err) == 480
+    assert rate_limit_delay(60, 60, cf.CloudflareRateLimitError("slow down", retry_after=300.5)) == 301